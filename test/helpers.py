@@ -1,7 +1,10 @@
+import functools
 import glob
 import os
 from typing import Sequence
 
+import xarray as xr
+
 
 def get_inputdata_file(name: str) -> str:
     return os.path.join(os.path.dirname(__file__), 'inputdata', name)
@@ -9,3 +12,9 @@ def get_inputdata_file(name: str) -> str:
 
 def get_inputdata_files(pattern: str) -> Sequence[str]:
     return glob.glob(os.path.join(os.path.dirname(__file__), 'inputdata', pattern))
+
+
+# Opened once per test session, callers must not modify the returned dataset.
+@functools.lru_cache(maxsize=16)
+def get_inputdata_dataset(name: str) -> xr.Dataset:
+    return xr.open_dataset(get_inputdata_file(name))
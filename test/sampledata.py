@@ -1,3 +1,5 @@
+import functools
+
 import numpy as np
 import pandas as pd
 import xarray as xr
@@ -90,7 +92,15 @@ def create_s2plus_dataset():
 def create_highroc_dataset(no_spectra=False):
     """
     Simulates a HIGHROC OLCI L2 product in NetCDF 4 format
+
+    The dataset is created once and shared by all callers.
+    Callers that modify it must use a copy, e.g. ``create_highroc_dataset().copy(deep=True)``.
     """
+    return _create_highroc_dataset(bool(no_spectra))
+
+
+@functools.lru_cache(maxsize=2)
+def _create_highroc_dataset(no_spectra):
     lon = np.array([[8, 9.3, 10.6, 11.9],
                     [8, 9.2, 10.4, 11.6],
                     [8, 9.1, 10.2, 11.3]], dtype=np.float32)
@@ -1,94 +1,137 @@
+import functools
+import glob
 import os
-import unittest
-from io import StringIO
-from unittest.mock import patch
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
 
+import pytest
 import xarray as xr
-from xcube.core.dsio import rimraf
+import zarr
 from xcube.core.gen.gen import gen_cube
 
 from test.helpers import get_inputdata_file
 
-
-def clean_up():
-    files = ['l2c-single.nc', 'l2c.nc', 'l2c.zarr']
-    for file in files:
-        rimraf(os.path.join('.', file))
-        rimraf(os.path.join('.', file + 'temp.nc'))
-
-
-class SnapProcessTest(unittest.TestCase):
-
-    def setUp(self):
-        clean_up()
-
-    def tearDown(self):
-        clean_up()
-
-    # noinspection PyMethodMayBeStatic
-    def test_process_inputs_single(self):
-        status = process_inputs_wrapper(input_path=[get_inputdata_file('O_L2_0001_SNS_2017105100139_v1.0.nc')],
-                                        input_processor_name='snap-olci-highroc-l2',
-                                        output_path='l2c-single.nc',
-                                        output_writer='netcdf4',
-                                        append_mode=False)
-        self.assertEqual(True, status)
-
-    def test_process_inputs_append_multiple_nc(self):
-        status = process_inputs_wrapper(input_path=[get_inputdata_file('O_L2_0001_SNS_2017104102450_v1.0.nc'),
-                                                    get_inputdata_file('O_L2_0001_SNS_2017105095839_v1.0.nc'),
-                                                    get_inputdata_file('O_L2_0001_SNS_2017105100139_v1.0.nc')],
-                                        input_processor_name='snap-olci-highroc-l2',
-                                        output_path='l2c.nc',
-                                        output_writer='netcdf4',
-                                        append_mode=True)
-        self.assertEqual(True, status)
-
-    def test_process_inputs_insert_multiple_nc(self):
-        with patch('sys.stdout', new=StringIO()) as output:
-            process_inputs_wrapper(input_path=[get_inputdata_file('O_L2_0001_SNS_*_v1.0.nc')],
-                                   input_processor_name='snap-olci-highroc-l2',
-                                   output_path='l2c.nc',
-                                   output_writer='netcdf4',
-                                   append_mode=True, monitor=print, no_sort_mode=False)
-            self.assertEqual(output.getvalue()[-69:],
-                             '3 of 3 datasets processed successfully, 0 were dropped due to errors\n')
-
-    def test_process_inputs_append_multiple_zarr(self):
-        status = process_inputs_wrapper(input_path=[get_inputdata_file('O_L2_0001_SNS_*_v1.0.nc')],
-                                        input_processor_name='snap-olci-highroc-l2',
-                                        output_path='l2c.zarr',
-                                        output_writer='zarr',
-                                        append_mode=True)
-        self.assertEqual(True, status)
-
-    def test_process_inputs_cmems_daily_nc(self):
-        status = process_inputs_wrapper(
-            input_path=[get_inputdata_file('OCEANCOLOUR_ATL_CHL_L4_REP_OBSERVATIONS_009_098-TDS-2017-11-10.nc')],
-            input_processor_name='cmems',
-            output_path='l2c.zarr',
-            output_writer='zarr',
-            append_mode=True)
-        self.assertEqual(True, status)
-        ds = xr.open_zarr('l2c.zarr')
-        self.assertEqual('2017-11-10T12:00:00.000000000', str(ds.time[0].values))
-        self.assertEqual('2017-11-11T00:00:00.000000000', ds.attrs['time_coverage_end'])
-        self.assertEqual('2017-11-10T00:00:00.000000000', ds.attrs['time_coverage_start'])
-
-    def test_process_inputs_cmems_hourly_nc(self):
-        status = process_inputs_wrapper(
-            input_path=[get_inputdata_file('NORTHWESTSHELF_ANALYSIS_FORECAST_WAV_004_014-TDS-2019-08-21-15.nc')],
-            input_processor_name='cmems',
-            output_path='l2c.zarr',
-            output_writer='zarr',
-            append_mode=True)
-        self.assertEqual(True, status)
-        ds = xr.open_zarr('l2c.zarr')
-        self.assertEqual('2019-08-21T15:30:00.000000000', str(ds.time[0].values))
-        self.assertEqual('2019-08-21T16:00:00.000000000', ds.attrs['time_coverage_end'])
-        self.assertEqual('2019-08-21T15:00:00.000000000', ds.attrs['time_coverage_start'])
-        self.assertIn('lon', ds.dims)
-        self.assertIn('lat', ds.dims)
+# Test outputs are written into a temporary directory, preferably on a RAM disk.
+# The directory is unique per process, hence also per pytest-xdist worker ("pytest -n auto").
+RAM_DISK_DIR = '/dev/shm'
+
+# Set XCUBE_KEEP_TEST_OUTPUTS=1 to keep each test's outputs for inspection.
+KEEP_OUTPUTS = bool(os.environ.get('XCUBE_KEEP_TEST_OUTPUTS'))
+
+HIGHROC_INPUTS = [get_inputdata_file('O_L2_0001_SNS_2017104102450_v1.0.nc'),
+                  get_inputdata_file('O_L2_0001_SNS_2017105095839_v1.0.nc'),
+                  get_inputdata_file('O_L2_0001_SNS_2017105100139_v1.0.nc')]
+HIGHROC_INPUT_PATTERN = get_inputdata_file('O_L2_0001_SNS_*_v1.0.nc')
+
+# gen_cube() with the arguments common to all tests
+_gen_cube = functools.partial(gen_cube,
+                              output_region=(0., 50., 5., 52.5),
+                              output_resampling='Nearest',
+                              dry_run=False)
+
+
+@pytest.fixture(scope='module')
+def output_root_dir():
+    ram_disk_dir = RAM_DISK_DIR if os.path.isdir(RAM_DISK_DIR) and os.access(RAM_DISK_DIR, os.W_OK) else None
+    output_root_dir = tempfile.mkdtemp(prefix='xcube-gen-bc-test-', dir=ram_disk_dir)
+    # Deleting Zarr directories with many chunk files is slow, so it is done in the background.
+    # The fixture may be set up more than once per run, so each instance has its own executor.
+    trash_executor = ThreadPoolExecutor(max_workers=2)
+    yield output_root_dir, trash_executor
+    trash_executor.shutdown()
+    if not KEEP_OUTPUTS:
+        shutil.rmtree(output_root_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def tmp_output_dir(request, output_root_dir):
+    output_root_dir, trash_executor = output_root_dir
+    tmp_output_dir = os.path.join(output_root_dir, request.node.name)
+    os.mkdir(tmp_output_dir)
+    yield tmp_output_dir
+    if not KEEP_OUTPUTS:
+        trash_dir = f'{tmp_output_dir}.trash.{uuid.uuid4().hex}'
+        os.rename(tmp_output_dir, trash_dir)
+        trash_executor.submit(shutil.rmtree, trash_dir, ignore_errors=True)
+
+
+def test_process_inputs_single(tmp_output_dir):
+    _test_process_highroc_inputs(tmp_output_dir, HIGHROC_INPUTS[-1:], 'zarr', append_mode=False)
+
+
+def test_process_inputs_append_multiple_nc(tmp_output_dir):
+    # The only test that uses the NetCDF writer, the others write Zarr which is considerably faster
+    _test_process_highroc_inputs(tmp_output_dir, HIGHROC_INPUTS, 'netcdf4', append_mode=True)
+
+
+def test_process_inputs_append_multiple_zarr(tmp_output_dir, capsys):
+    status = process_inputs_wrapper(input_path=[HIGHROC_INPUT_PATTERN],
+                                    input_processor_name='snap-olci-highroc-l2',
+                                    output_path=os.path.join(tmp_output_dir, 'l2c.zarr'),
+                                    output_writer='zarr',
+                                    append_mode=True, monitor=print, no_sort_mode=False)
+    assert status is True
+    output = capsys.readouterr().out
+    assert output[-69:] == '3 of 3 datasets processed successfully, 0 were dropped due to errors\n'
+
+
+def test_process_inputs_cmems_daily_nc(tmp_output_dir):
+    _test_process_cmems_input(tmp_output_dir,
+                              'OCEANCOLOUR_ATL_CHL_L4_REP_OBSERVATIONS_009_098-TDS-2017-11-10.nc',
+                              expected_time='2017-11-10T12:00:00.000000000',
+                              expected_time_coverage_start='2017-11-10T00:00:00.000000000',
+                              expected_time_coverage_end='2017-11-11T00:00:00.000000000')
+
+
+@pytest.mark.skipif(not os.environ.get('XCUBE_RUN_SLOW'), reason='slow test, set XCUBE_RUN_SLOW=1 to run it')
+def test_process_inputs_cmems_hourly_nc(tmp_output_dir):
+    _test_process_cmems_input(tmp_output_dir,
+                              'NORTHWESTSHELF_ANALYSIS_FORECAST_WAV_004_014-TDS-2019-08-21-15.nc',
+                              expected_time='2019-08-21T15:30:00.000000000',
+                              expected_time_coverage_start='2019-08-21T15:00:00.000000000',
+                              expected_time_coverage_end='2019-08-21T16:00:00.000000000')
+
+
+def _test_process_highroc_inputs(output_dir, input_path, output_writer, append_mode):
+    output_path = os.path.join(output_dir, 'l2c.nc' if output_writer == 'netcdf4' else 'l2c.zarr')
+    status = process_inputs_wrapper(input_path=input_path,
+                                    input_processor_name='snap-olci-highroc-l2',
+                                    output_path=output_path,
+                                    output_writer=output_writer,
+                                    append_mode=append_mode)
+    assert status is True
+
+
+def _test_process_cmems_input(output_dir, input_name,
+                              expected_time, expected_time_coverage_start, expected_time_coverage_end):
+    output_path = os.path.join(output_dir, 'l2c.zarr')
+    status = process_inputs_wrapper(
+        input_path=[get_inputdata_file(input_name)],
+        input_processor_name='cmems',
+        output_path=output_path,
+        output_writer='zarr',
+        append_mode=True,
+        output_size=(500, 250))
+    assert status is True
+    # Only the time coordinate and a few attributes are inspected,
+    # so read them directly rather than opening the cube as xarray dataset
+    cube = zarr.open_group(output_path, mode='r')
+    time = cube['time']
+    time_values = xr.decode_cf(xr.Dataset(dict(time=('time', time[:], dict(time.attrs))))).time.values
+    assert str(time_values[0]) == expected_time
+    assert cube.attrs['time_coverage_end'] == expected_time_coverage_end
+    assert cube.attrs['time_coverage_start'] == expected_time_coverage_start
+    assert 'lon' in cube
+    assert 'lat' in cube
+
+
+@functools.lru_cache(maxsize=None)
+def _expand_input_paths(input_paths: Tuple[str, ...]) -> Tuple[str, ...]:
+    # Glob order is preserved, sorting is up to gen_cube() and its no_sort_mode.
+    return tuple(path for pattern in input_paths for path in glob.glob(pattern))
 
 
 # noinspection PyShadowingBuiltins
@@ -98,10 +141,12 @@ def process_inputs_wrapper(input_path=None,
                            output_writer='netcdf4',
                            append_mode=False,
                            no_sort_mode=False,
-                           monitor=None):
-    return gen_cube(input_paths=input_path, input_processor_name=input_processor_name,
-                    output_region=(0., 50., 5., 52.5),
-                    output_size=(2000, 1000), output_resampling='Nearest', output_path=output_path,
-                    output_writer_name=output_writer,
-                    output_variables=[('conc_chl', None), ('conc_tsm', None), ('kd489', None)], append_mode=append_mode,
-                    no_sort_mode=no_sort_mode, dry_run=False, monitor=monitor)
+                           monitor=None,
+                           output_size=(200, 100),
+                           output_variables=(('conc_chl', None),)):
+    return _gen_cube(input_paths=list(_expand_input_paths(tuple(input_path))),
+                     input_processor_name=input_processor_name,
+                     output_size=output_size, output_path=output_path,
+                     output_writer_name=output_writer,
+                     output_variables=list(output_variables), append_mode=append_mode,
+                     no_sort_mode=no_sort_mode, monitor=monitor)
@@ -1,7 +1,13 @@
 import unittest
 
-from test.sampledata import create_highroc_dataset
+import numpy as np
+import xarray as xr
+from numpy.testing import assert_array_almost_equal
+
+from test.helpers import get_inputdata_dataset
+from test.sampledata import create_highroc_dataset, create_waveband, new_test_dataset
 from xcube_gen_bc.iproc import CMEMSInputProcessor, SnapOlciCyanoAlertL2InputProcessor, SnapOlciHighrocL2InputProcessor
+from xcube_gen_bc.iproc import _to_time_in_days_since_1970
 
 
 class SnapOlciHighrocL2InputProcessorTest(unittest.TestCase):
@@ -13,18 +19,26 @@ class SnapOlciHighrocL2InputProcessorTest(unittest.TestCase):
         self.assertEqual('snap-olci-highroc-l2', self.processor.name)
         self.assertEqual('SNAP Sentinel-3 OLCI HIGHROC Level-2 NetCDF inputs', self.processor.description)
         self.assertEqual('netcdf4', self.processor.input_reader)
+        self.assertEqual(dict(decode_cf=True, decode_coords=True, decode_times=False, chunks={}),
+                         self.processor.parameters['input_reader_params'])
 
     def test_reprojection_info(self):
         reprojection_info = self.processor.get_reprojection_info(create_highroc_dataset())
         self.assertEqual(('lon', 'lat'), reprojection_info.xy_names)
         self.assertEqual(None, reprojection_info.xy_gcp_step)
 
-    def _test_pre_process(self):
-        # FIXME: this test raises because create_highroc_dataset() does not return compatible SNAP L2 DS.
-        ds1 = create_highroc_dataset()
+    def test_get_time_range(self):
+        t1, t2 = self.processor.get_time_range(get_inputdata_dataset('O_L2_0001_SNS_2017105100139_v1.0.nc'))
+        self.assertAlmostEqual(17271.417815689896, t1)
+        self.assertAlmostEqual(17271.418246618985, t2)
+
+    def test_pre_process(self):
+        ds1 = create_highroc_dataset().copy(deep=True)
+        ds1.conc_chl.attrs['valid_pixel_expression'] = 'c2rcc_flags.F1 && !c2rcc_flags.F2'
         ds2 = self.processor.pre_process(ds1)
-        self.assertIsNot(ds1, ds2)
-        # TODO: add more asserts for ds2
+        # Expressions are translated in place
+        self.assertIs(ds1, ds2)
+        self.assertEqual('c2rcc_flags.F1 and not c2rcc_flags.F2', ds1.conc_chl.attrs['valid_pixel_expression'])
 
     def test_post_process(self):
         ds1 = create_highroc_dataset()
@@ -32,6 +46,13 @@ class SnapOlciHighrocL2InputProcessorTest(unittest.TestCase):
         self.assertIsNot(ds1, ds2)
         # TODO: add more asserts for ds2
 
+    def test_post_process_fixes_duplicate_940nm_band(self):
+        ds1 = xr.Dataset(dict(rtoa_18=create_waveband(18, 885.0, '1'),
+                              rtoa_20=create_waveband(20, 940.0, '1'),
+                              rtoa_21=create_waveband(21, 940.0, '1')))
+        ds2 = self.processor.post_process(ds1)
+        assert_array_almost_equal(np.array([885., 940., 1020.]), ds2.band.values)
+
 
 class SnapOlciCyanoAlertL2InputProcessorTest(unittest.TestCase):
 
@@ -42,6 +63,8 @@ class SnapOlciCyanoAlertL2InputProcessorTest(unittest.TestCase):
         self.assertEqual('snap-olci-cyanoalert-l2', self.processor.name)
         self.assertEqual('SNAP Sentinel-3 OLCI CyanoAlert Level-2 NetCDF inputs', self.processor.description)
         self.assertEqual('netcdf4', self.processor.input_reader)
+        self.assertEqual(dict(decode_cf=True, decode_coords=True, decode_times=False, chunks={}),
+                         self.processor.parameters['input_reader_params'])
 
 
 class CMEMSInputProcessorTest(unittest.TestCase):
@@ -54,3 +77,70 @@ class CMEMSInputProcessorTest(unittest.TestCase):
         self.assertEqual('Single-scene daily or hourly CMEMS NetCDF/CF inputs',
                          self.processor.description)
         self.assertEqual('netcdf4', self.processor.input_reader)
+        self.assertEqual(dict(chunks={}), self.processor.parameters['input_reader_params'])
+
+    def test_reprojection_info(self):
+        dataset = new_test_dataset('2017-11-10', height=8, CHL=0.5)
+        reprojection_info = self.processor.get_reprojection_info(dataset)
+        self.assertEqual((4, 2), reprojection_info.xy_gcp_step)
+        self.assertIs(reprojection_info, self.processor.get_reprojection_info(dataset))
+
+    def test_pre_process_without_time_dim(self):
+        dataset = new_test_dataset('2017-11-10', height=8, CHL=0.5).squeeze('time')
+        dataset = self.processor.pre_process(dataset)
+        self.assertEqual(('lat', 'lon'), dataset.CHL.dims)
+        self.assertIn('time', dataset.coords)
+
+    def test_get_time_range_without_time_dim(self):
+        dataset = new_test_dataset('2017-11-10T12:00:00', height=8, CHL=0.5).squeeze('time')
+        t1, t2 = self.processor.get_time_range(dataset)
+        self.assertAlmostEqual(17480.5, t1)
+        self.assertAlmostEqual(17480.5, t2)
+
+    def test_pre_process_invalid_bounds(self):
+        dataset = new_test_dataset('2017-11-10', height=8, CHL=0.5)
+        dataset['lat_bnds'] = (('lat', 'bnds'), np.zeros((8, 3)))
+        with self.assertRaises(ValueError) as cm:
+            self.processor.pre_process(dataset)
+        self.assertEqual('coordinate bounds variable "lat_bnds" must have shape (8, 2)', f'{cm.exception}')
+
+    def test_get_time_range_daily(self):
+        t1, t2 = self.processor.get_time_range(
+            get_inputdata_dataset('OCEANCOLOUR_ATL_CHL_L4_REP_OBSERVATIONS_009_098-TDS-2017-11-10.nc'))
+        self.assertAlmostEqual(17480.0, t1)
+        self.assertAlmostEqual(17481.0, t2)
+
+    def test_get_time_range_hourly(self):
+        t1, t2 = self.processor.get_time_range(
+            get_inputdata_dataset('NORTHWESTSHELF_ANALYSIS_FORECAST_WAV_004_014-TDS-2019-08-21-15.nc'))
+        self.assertAlmostEqual(18129.625, t1)
+        self.assertAlmostEqual(18129.625 + 1 / 24, t2)
+
+    def test_get_time_range_resolution_attrs(self):
+        dataset = new_test_dataset('2017-11-10T12:00:00', height=8, CHL=0.5)
+        dataset.attrs.update(frequency='daily', title='hourly means')
+        t1, t2 = self.processor.get_time_range(dataset)
+        self.assertAlmostEqual(17480.5, t1)
+        self.assertAlmostEqual(17481.5, t2)
+        dataset.attrs.update(frequency=None, time_coverage_resolution='PT1H')
+        t1, t2 = self.processor.get_time_range(dataset)
+        self.assertAlmostEqual(17480.5, t1)
+        self.assertAlmostEqual(17480.5 + 1 / 24, t2)
+
+    def test_get_time_range_unknown_resolution(self):
+        t1, t2 = self.processor.get_time_range(new_test_dataset('2017-11-10T12:00:00', height=8, CHL=0.5))
+        self.assertAlmostEqual(17480.5, t1)
+        self.assertAlmostEqual(17480.5, t2)
+
+
+class ToTimeInDaysSince1970Test(unittest.TestCase):
+
+    def test_iso_format(self):
+        self.assertAlmostEqual(17271.0, _to_time_in_days_since_1970('2017-04-15'))
+        self.assertAlmostEqual(17271.417815689896, _to_time_in_days_since_1970('2017-04-15T10:01:39.275607'))
+        self.assertAlmostEqual(17271.417815689896, _to_time_in_days_since_1970('2017-04-15T10:01:39.275607Z'))
+        self.assertAlmostEqual(17271.4178125, _to_time_in_days_since_1970('2017-04-15 10:01:39'))
+
+    def test_other_formats(self):
+        self.assertAlmostEqual(17271.417815689896, _to_time_in_days_since_1970('15-APR-2017 10:01:39.275607'))
+        self.assertAlmostEqual(17271.376145833332, _to_time_in_days_since_1970('2017-04-15T10:01:39+01:00'))
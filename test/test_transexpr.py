@@ -10,6 +10,29 @@ class TranslateExpressionAttributesTest(unittest.TestCase):
         ds2 = translate_snap_expr_attributes(ds1)
         self.assertIsNot(ds1, ds2)
 
+    def test_no_expressions(self):
+        ds1 = create_highroc_dataset()
+        ds1 = ds1.drop_vars([var_name for var_name in ds1.variables
+                             if 'valid_pixel_expression' in ds1[var_name].attrs])
+        ds2 = translate_snap_expr_attributes(ds1)
+        self.assertIs(ds1, ds2)
+
+    def test_translates_expressions(self):
+        ds1 = create_highroc_dataset().copy(deep=True)
+        ds1.conc_chl.attrs['valid_pixel_expression'] = 'c2rcc_flags.F1 && !c2rcc_flags.F2'
+        ds1.conc_chl.attrs['expression'] = 'conc_chl != NaN'
+        ds2 = translate_snap_expr_attributes(ds1)
+        self.assertEqual('c2rcc_flags.F1 and not c2rcc_flags.F2', ds2.conc_chl.attrs['valid_pixel_expression'])
+        self.assertEqual('conc_chl!=NaN', ds2.conc_chl.attrs['expression'])
+        self.assertEqual('c2rcc_flags.F1 && !c2rcc_flags.F2', ds1.conc_chl.attrs['valid_pixel_expression'])
+
+    def test_inplace(self):
+        ds1 = create_highroc_dataset().copy(deep=True)
+        ds1.conc_chl.attrs['valid_pixel_expression'] = 'c2rcc_flags.F1 && !c2rcc_flags.F2'
+        ds2 = translate_snap_expr_attributes(ds1, inplace=True)
+        self.assertIs(ds1, ds2)
+        self.assertEqual('c2rcc_flags.F1 and not c2rcc_flags.F2', ds1.conc_chl.attrs['valid_pixel_expression'])
+
 
 class TranslateExprTest(unittest.TestCase):
     def test_translate_expr(self):
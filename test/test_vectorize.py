@@ -40,6 +40,21 @@ class VectorizeTest(unittest.TestCase):
         self.assertEqual('Atmospherically corrected angular dependent remote sensing reflectances',
                          rrs_var.attrs.get('long_name'))
 
+    def test_vectorize_spectra_with_shared_coords(self):
+        dataset = create_highroc_dataset()
+        dataset = dataset.set_coords(['lon', 'lat'])
+        self.assertEqual(('lat', 'lon'), tuple(sorted(dataset['rtoa_1'].coords)))
+
+        vectorized_dataset = vectorize_wavebands(dataset)
+
+        rtoa_var = vectorized_dataset['rtoa']
+        self.assertEqual((16, 3, 4), rtoa_var.shape)
+        self.assertEqual(('band', 'lat', 'lon'), tuple(sorted(rtoa_var.coords)))
+        self.assertEqual(('y', 'x'), rtoa_var.coords['lon'].dims)
+        self.assertEqual(('y', 'x'), rtoa_var.coords['lat'].dims)
+        assert_array_almost_equal(dataset['lon'].values, rtoa_var.coords['lon'].values)
+        assert_array_almost_equal(dataset['lat'].values, rtoa_var.coords['lat'].values)
+
     def test_vectorize_nothing(self):
         dataset = create_highroc_dataset(no_spectra=True)
         vectorized_dataset = vectorize_wavebands(dataset)
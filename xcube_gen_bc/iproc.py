@@ -18,12 +18,12 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-import datetime
+import functools
+import re
 from abc import ABCMeta
 from typing import Tuple, Dict, Any
 
 import numpy as np
-import pandas as pd
 import xarray as xr
 
 from xcube.constants import CRS_WKT_EPSG_4326
@@ -44,7 +44,8 @@ class SnapNetcdfInputProcessor(XYInputProcessor, metaclass=ABCMeta):
         default_parameters.update(input_reader='netcdf4',
                                   input_reader_params=dict(decode_cf=True,
                                                            decode_coords=True,
-                                                           decode_times=False),
+                                                           decode_times=False,
+                                                           chunks={}),
                                   xy_names=('lon', 'lat'),
                                   xy_tp_names=('TP_longitude', 'TP_latitude'),
                                   xy_crs=CRS_WKT_EPSG_4326)
@@ -60,19 +61,21 @@ class SnapNetcdfInputProcessor(XYInputProcessor, metaclass=ABCMeta):
             t2 = dataset.attrs.get('stop_date', t1)
         if t1 is None or t2 is None:
             raise ValueError('illegal L2 input: missing start/stop time')
-        t1 = to_time_in_days_since_1970(t1)
-        t2 = to_time_in_days_since_1970(t2)
+        t1 = _to_time_in_days_since_1970(str(t1))
+        t2 = _to_time_in_days_since_1970(str(t2))
         return t1, t2
 
     def pre_process(self, dataset: xr.Dataset) -> xr.Dataset:
         """ Do any pre-processing before reprojection. """
-        return translate_snap_expr_attributes(dataset)
+        # The input dataset has been opened for this processor only, so it may be modified
+        return translate_snap_expr_attributes(dataset, inplace=True)
 
     def post_process(self, dataset: xr.Dataset) -> xr.Dataset:
         def new_band_coord_var_ex(band_dim_name: str, band_values: np.ndarray) -> xr.DataArray:
             # Bug in HIGHROC OLCI L2 data: both bands 20 and 21 have wavelengths at 940 nm
-            if band_values[-2] == band_values[-1] and band_values[-1] == 940.:
-                band_values[-1] = 1020.
+            if band_values.size >= 2 and band_values[-2] == band_values[-1] == 940.:
+                # Don't modify band_values in place, it is owned by the caller
+                band_values = np.append(band_values[:-1], 1020.)
             return new_band_coord_var(band_dim_name, band_values)
 
         return vectorize_wavebands(dataset, new_band_coord_var_ex)
@@ -98,6 +101,11 @@ class SnapOlciCyanoAlertL2InputProcessor(SnapNetcdfInputProcessor):
         super().__init__('snap-olci-cyanoalert-l2', **parameters)
 
 
+# CMEMS inputs must have at least one data variable with these dimensions
+_CMEMS_REQUIRED_DIMS_3D = ("time", "lat", "lon")
+_CMEMS_REQUIRED_DIMS_2D = ("lat", "lon")
+
+
 class CMEMSInputProcessor(XYInputProcessor):
     """
     CMEMS input processor that expects input datasets that do not have time bounds:
@@ -112,35 +120,47 @@ class CMEMSInputProcessor(XYInputProcessor):
     The CMEMS input processor can be configured by the following parameters:
 
     * ``input_reader`` the input reader identifier, default is "netcdf4".
+    * ``input_reader_params`` parameters passed to the input reader, default is ``dict(chunks={})``
+      so that data variables are read lazily.
 
     """
 
     def __init__(self, **parameters):
         super().__init__('cmems', **parameters)
+        # Reprojection infos only depend on the lon/lat sizes of the input datasets
+        self._reprojection_infos = {}
 
     @property
     def default_parameters(self) -> Dict[str, Any]:
         default_parameters = super().default_parameters
         default_parameters.update(input_reader='netcdf4',
+                                  input_reader_params=dict(chunks={}),
                                   xy_crs=CRS_WKT_EPSG_4326)
         return default_parameters
 
     def get_reprojection_info(self, dataset: xr.Dataset) -> ReprojectionInfo:
-        return super().get_reprojection_info(dataset).derive(
-            xy_gcp_step=(max(1, len(dataset.lon) // 4),
-                         max(1, len(dataset.lat) // 4))
-        )
+        size = dataset.sizes['lon'], dataset.sizes['lat']
+        reprojection_info = self._reprojection_infos.get(size)
+        if reprojection_info is None:
+            reprojection_info = super().get_reprojection_info(dataset).derive(
+                xy_gcp_step=(max(1, size[0] // 4),
+                             max(1, size[1] // 4))
+            )
+            self._reprojection_infos[size] = reprojection_info
+        return reprojection_info
 
     def pre_process(self, dataset: xr.Dataset) -> xr.Dataset:
+        rename_map = {}
         if 'longitude' in dataset.dims:
-            dataset = dataset.rename(({'longitude': 'lon'}))
-
+            rename_map['longitude'] = 'lon'
         if 'latitude' in dataset.dims:
-            dataset = dataset.rename(({'latitude': 'lat'}))
+            rename_map['latitude'] = 'lat'
+        if rename_map:
+            dataset = dataset.rename(rename_map)
 
         self._validate(dataset)
 
-        if "time" in dataset:
+        if "time" in dataset.dims:
             # Remove time dimension of length 1.
             dataset = dataset.squeeze("time")
 
@@ -148,31 +168,27 @@ class CMEMSInputProcessor(XYInputProcessor):
 
     def get_time_range(self, dataset: xr.Dataset) -> Tuple[float, float]:
         time_coverage_start, time_coverage_end = None, None
-        date_format = '%Y-%m-%d %H:%M:%S'
-        if "time" in dataset:
-            time_coverage_start = str(dataset.time[0].values)
-            date = pd.to_datetime(str(dataset.time[0].values), utc=True)
-            if 'daily' in str(dataset.attrs.values()):
-                time_coverage_end = datetime.datetime.strftime((date + datetime.timedelta(days=1)), date_format)
-            if 'hourly' in str(dataset.attrs.values()):
-                time_coverage_end = datetime.datetime.strftime((date + datetime.timedelta(hours=1)), date_format)
-
-        return to_time_in_days_since_1970(time_coverage_start), to_time_in_days_since_1970(time_coverage_end)
+        if "time" in dataset.coords:
+            # The time coordinate may also be a scalar
+            time = dataset.variables["time"].values.flat[0]
+            if isinstance(time, np.datetime64):
+                time_coverage_start = _datetime64_to_days(time)
+            else:
+                # e.g. cftime objects if times were not decoded into datetime64
+                time_coverage_start = _to_time_in_days_since_1970(str(time))
+            time_coverage_end = time_coverage_start + _get_time_resolution(dataset)
+
+        return time_coverage_start, time_coverage_end
 
     def _validate(self, dataset):
         self._check_coordinate_var(dataset, "lon", min_length=2)
         self._check_coordinate_var(dataset, "lat", min_length=2)
         if "time" in dataset.dims:
             self._check_coordinate_var(dataset, "time", max_length=1)
-            required_dims = ("time", "lat", "lon")
+            required_dims = _CMEMS_REQUIRED_DIMS_3D
         else:
-            required_dims = ("lat", "lon")
-        count = 0
-        for var_name in dataset.data_vars:
-            var = dataset.data_vars[var_name]
-            if var.dims == required_dims:
-                count += 1
-        if count == 0:
+            required_dims = _CMEMS_REQUIRED_DIMS_2D
+        if not any(var.dims == required_dims for var in dataset.data_vars.values()):
             raise ValueError(f"dataset has no variables with required dimensions {required_dims!r}")
 
     # noinspection PyMethodMayBeStatic
@@ -180,17 +196,65 @@ class CMEMSInputProcessor(XYInputProcessor):
                               min_length: int = None, max_length: int = None):
         if coord_var_name not in dataset.coords:
             raise ValueError(f'missing coordinate variable "{coord_var_name}"')
-        coord_var = dataset.coords[coord_var_name]
-        if len(coord_var.shape) != 1:
-            raise ValueError('coordinate variable "lon" must be 1D')
+        # Plain variables suffice here, dataset.coords[...] would create a new DataArray
+        coord_var = dataset.variables[coord_var_name]
+        if coord_var.ndim != 1:
+            raise ValueError(f'coordinate variable "{coord_var_name}" must be 1D')
+        length = coord_var.size
         coord_var_bnds_name = coord_var.attrs.get("bounds", coord_var_name + "_bnds")
-        if coord_var_bnds_name in dataset:
-            coord_bnds_var = dataset[coord_var_bnds_name]
-            expected_shape = (len(coord_var), 2)
-            if coord_bnds_var.shape != expected_shape:
-                raise ValueError(f'coordinate bounds variable "{coord_bnds_var}" must have shape {expected_shape!r}')
+        if coord_var_bnds_name in dataset.variables:
+            expected_shape = (length, 2)
+            if dataset.variables[coord_var_bnds_name].shape != expected_shape:
+                raise ValueError(f'coordinate bounds variable "{coord_var_bnds_name}"'
+                                 f' must have shape {expected_shape!r}')
         else:
-            if min_length is not None and len(coord_var) < min_length:
+            if min_length is not None and length < min_length:
                 raise ValueError(f'coordinate variable "{coord_var_name}" must have at least {min_length} value(s)')
-            if max_length is not None and len(coord_var) > max_length:
+            if max_length is not None and length > max_length:
                 raise ValueError(f'coordinate variable "{coord_var_name}" must have no more than {max_length} value(s)')
+
+
+_ISO_TIME_REGEX = re.compile(r'\d{4}-\d{2}-\d{2}([T ]\d{2}(:\d{2}(:\d{2}(\.\d+)?)?)?)?Z?')
+_EPOCH = np.datetime64('1970-01-01', 'us')
+_ONE_DAY = np.timedelta64(1, 'D')
+
+
+# Inputs of a batch often share time strings, e.g. equal start and stop times
+@functools.lru_cache(maxsize=4096)
+def _to_time_in_days_since_1970(time_str: str) -> float:
+    # NumPy parses ISO 8601 strings without the pandas overhead of
+    # to_time_in_days_since_1970(). Other formats, e.g. SNAP's "15-APR-2017 10:01:39.275607",
+    # and timezone offsets are still left to xcube.
+    if not _ISO_TIME_REGEX.fullmatch(time_str):
+        return to_time_in_days_since_1970(time_str)
+    return _datetime64_to_days(np.datetime64(time_str.rstrip('Z'), 'us'))
+
+
+def _datetime64_to_days(time: np.datetime64) -> float:
+    return float((time - _EPOCH) / _ONE_DAY)
+
+
+# Time resolutions in days for values of the "frequency" or "time_coverage_resolution" attributes
+_TIME_RESOLUTIONS = {'hourly': 1. / 24.,
+                     '1h': 1. / 24.,
+                     'pt1h': 1. / 24.,
+                     'daily': 1.,
+                     '1d': 1.,
+                     'p1d': 1.}
+
+
+def _get_time_resolution(dataset: xr.Dataset) -> float:
+    for attr_name in ('frequency', 'time_coverage_resolution'):
+        value = dataset.attrs.get(attr_name)
+        if isinstance(value, str) and value.lower() in _TIME_RESOLUTIONS:
+            return _TIME_RESOLUTIONS[value.lower()]
+    # Otherwise the resolution is only given by free text, e.g. in the "title" attribute
+    if _has_attr_value_containing(dataset, 'hourly'):
+        return 1. / 24.
+    if _has_attr_value_containing(dataset, 'daily'):
+        return 1.
+    return 0.
+
+
+def _has_attr_value_containing(dataset: xr.Dataset, text: str) -> bool:
+    return any(text in value for value in dataset.attrs.values() if isinstance(value, str))
@@ -20,6 +20,7 @@
 # SOFTWARE.
 
 import collections
+import functools
 import re
 from typing import Generator
 
@@ -27,7 +28,17 @@ import xarray as xr
 
 Token = collections.namedtuple('Token', ['kind', 'value'])
 
-_TOKEN_REGEX = None
+_TOKEN_SPECIFICATION = [
+    ('NUM', r'\d+(\.\d*)?'),  # Integer or decimal number
+    ('ID', r'[_A-Za-z][_A-Za-z0-9]*'),  # Identifiers
+    ('OP', r'\&\&|\|\||\*\*|\!\=|\=\=|\>=|\<=|\<|\>|\+|\-|\*|\!|\%|\^|\.|\?|\:|\||\&'),  # Operators
+    ('PAR', r'[\(\)]'),  # Parentheses
+    ('WHITE', r'[ \t\n\r]+'),  # Skip over spaces and tabs, new lines
+    ('ERR', r'.'),  # Any other character
+]
+_TOKEN_REGEX = re.compile('|'.join('(?P<%s>%s)' % pair for pair in _TOKEN_SPECIFICATION))
+# Kinds of tokens that must be separated by a space when adjacent
+_WORD_KINDS = frozenset(('ID', 'KW', 'NUM'))
 _KW_MAPPINGS = {'NOT': 'not',
                 'AND': 'and',
                 'OR': 'or',
@@ -35,6 +46,8 @@ _KW_MAPPINGS = {'NOT': 'not',
                 'false': 'False',
                 'NaN': 'NaN',
                 'nan': 'isnan'}
+# Names of variable attributes that contain SNAP band math expressions
+_SNAP_EXPR_ATTR_NAMES = ('expression', 'valid_pixel_expression')
 _OP_MAPPINGS = {'?': 'if',
                 ':': 'else',
                 '!': 'not',
@@ -43,33 +56,30 @@ _OP_MAPPINGS = {'?': 'if',
                 '^': '**'}
 
 
-def translate_snap_expr_attributes(dataset: xr.Dataset) -> xr.Dataset:
-    dataset = dataset.copy()
-    for var_name in dataset.variables:
-        var = dataset[var_name]
-        if 'expression' in var.attrs:
-            var.attrs['expression'] = translate_snap_expr(var.attrs['expression'])
-        if 'valid_pixel_expression' in var.attrs:
-            var.attrs['valid_pixel_expression'] = translate_snap_expr(var.attrs['valid_pixel_expression'])
-    return dataset
-
+def translate_snap_expr_attributes(dataset: xr.Dataset, inplace: bool = False) -> xr.Dataset:
+    """
+    Translate the SNAP band math expressions in the variable attributes of a dataset to Python expressions.
 
-def _get_token_regex():
-    global _TOKEN_REGEX
-    if _TOKEN_REGEX is None:
-        token_specification = [
-            ('NUM', r'\d+(\.\d*)?'),  # Integer or decimal number
-            ('ID', r'[_A-Za-z][_A-Za-z0-9]*'),  # Identifiers
-            ('OP', r'\&\&|\|\||\*\*|\!\=|\=\=|\>=|\<=|\<|\>|\+|\-|\*|\!|\%|\^|\.|\?|\:|\||\&'),  # Operators
-            ('PAR', r'[\(\)]'),  # Parentheses
-            ('WHITE', r'[ \t\n\r]+'),  # Skip over spaces and tabs, new lines
-            ('ERR', r'.'),  # Any other character
-        ]
-        _TOKEN_REGEX = '|'.join('(?P<%s>%s)' % pair for pair in token_specification)
-        _TOKEN_REGEX = re.compile(_TOKEN_REGEX)
-    return _TOKEN_REGEX
+    :param dataset: The dataset
+    :param inplace: Whether to modify the attributes of *dataset* in place instead of those of a copy.
+    :return: The dataset with translated expressions, which is *dataset* if *inplace* is true
+        or if there are no expressions.
+    """
+    if not any(attr_name in var.attrs for var in dataset.variables.values() for attr_name in _SNAP_EXPR_ATTR_NAMES):
+        return dataset
+    if not inplace:
+        dataset = dataset.copy()
+    # Use the variables directly, dataset[var_name] would create a new DataArray including its coordinates
+    for var in dataset.variables.values():
+        attrs = var.attrs
+        for attr_name in _SNAP_EXPR_ATTR_NAMES:
+            if attr_name in attrs:
+                attrs[attr_name] = translate_snap_expr(attrs[attr_name])
+    return dataset
 
 
+# The expressions of a product type are the same in all of its granules, so they are translated only once.
+@functools.lru_cache(maxsize=1024)
 def translate_snap_expr(snap_expr: str) -> str:
     """
     Translate a SNAP band math expression to a syntactically correct Python expression.
@@ -82,9 +92,9 @@ def translate_snap_expr(snap_expr: str) -> str:
     for token in tokenize_expr(snap_expr):
         kind = token.kind
         value = token.value
-        if kind == 'ID' or kind == 'KW' or kind == 'NUM':
+        if kind in _WORD_KINDS:
             value = _KW_MAPPINGS.get(value, value)
-            if last_kind == 'ID' or last_kind == 'KW' or last_kind == 'NUM':
+            if last_kind in _WORD_KINDS:
                 py_expr += ' '
         elif kind == 'OP':
             value = _OP_MAPPINGS.get(value, value)
@@ -98,8 +108,7 @@ def translate_snap_expr(snap_expr: str) -> str:
 
 
 def tokenize_expr(expr: str) -> Generator[Token, None, None]:
-    token_regex = _get_token_regex()
-    for match in re.finditer(token_regex, expr):
+    for match in _TOKEN_REGEX.finditer(expr):
         kind = match.lastgroup
         value = match.group(kind)
         if kind == 'WHITE':
@@ -69,7 +69,8 @@ def vectorize_wavebands(dataset: xr.Dataset,
     for band_values, band_dim_index, spectrum_name, spectrum_variables in band_list:
         band_dim_name = 'band' if band_dim_count == 0 else 'band' + str(band_dim_index + 1)
         band_coord_var = band_coord_var_factory(band_dim_name, band_values)
-        spectrum_variable = xr.concat(spectrum_variables, dim=band_dim_name)
+        # Spectrum variables share their other coordinates (e.g. 2D lon/lat), so don't compare them
+        spectrum_variable = xr.concat(spectrum_variables, dim=band_dim_name, coords='minimal', compat='override')
         time_coord_size = spectrum_variable.sizes.get('time', 0)
         if time_coord_size == 1 and spectrum_variable.dims[0] != 'time':
             spectrum_variable = spectrum_variable.squeeze('time')